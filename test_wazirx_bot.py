@@ -0,0 +1,235 @@
+# test_wazirx_bot.py
+import numpy as np
+import pytest
+
+import wazirx_bot as bot
+from wazirx_analytics import PnLAnalytics, TradeWindow
+
+
+@pytest.fixture(autouse=True)
+def risk(monkeypatch):
+    monkeypatch.setattr(bot, 'RISK_PER_TRADE_PERCENT', 3)
+    monkeypatch.setattr(bot, 'BATCH_MAX_RISK_PERCENT', 100)
+
+
+def size(prices, sls, usdt_free=100.0, amount_steps=None, min_notionals=None, max_positions=3):
+    n = len(prices)
+    return bot.calculate_batch_position_sizes(
+        prices, sls, usdt_free,
+        amount_steps if amount_steps is not None else [0.0001] * n,
+        min_notionals if min_notionals is not None else [1.0] * n,
+        max_positions
+    )
+
+
+# ============= BATCH POSITION SIZING =============
+def test_each_signal_gets_per_trade_risk():
+    quantities, reasons = size([100.0, 100.0, 100.0], [90.0, 90.0, 90.0])
+    # 3% of 100 USDT each, 10% SL distance -> 30 USDT each
+    assert list(quantities) == [0.3, 0.3, 0.3]
+    assert list(reasons) == ["OK", "OK", "OK"]
+
+
+def test_batch_risk_budget_goes_by_priority(monkeypatch):
+    monkeypatch.setattr(bot, 'BATCH_MAX_RISK_PERCENT', 5)
+    quantities, reasons = size([100.0, 100.0, 100.0], [90.0, 90.0, 90.0])
+    # 5 USDT of risk: 3 to the first signal, the remaining 2 to the second
+    assert list(quantities) == [0.3, 0.2, 0]
+    assert reasons[2] == "No risk budget left"
+
+
+def test_capital_goes_to_higher_priority_first():
+    quantities, reasons = size([100.0, 100.0, 100.0], [99.0, 99.0, 99.0])
+    # each asks for 100 USDT, only the first one gets it
+    assert quantities[0] == 1.0
+    assert list(quantities[1:]) == [0, 0]
+    assert list(reasons[1:]) == ["No capital left", "No capital left"]
+
+
+def test_failed_signal_releases_slot_and_capital():
+    quantities, reasons = size(
+        [100.0, 100.0, 100.0], [100.0, 90.0, 90.0],
+        min_notionals=[1.0, 1000.0, 1.0], max_positions=1
+    )
+    assert reasons[0] == "Invalid SL distance"
+    assert reasons[1].startswith("Order too small")
+    assert quantities[2] == 0.3
+    assert reasons[2] == "OK"
+
+
+def test_too_small_signal_does_not_starve_later_ones():
+    quantities, reasons = size([100.0, 100.0, 100.0], [99.0, 99.0, 99.0], min_notionals=[1000.0, 1.0, 1.0])
+    assert reasons[0] == "Order too small ($100.0)"
+    assert list(quantities) == [0, 1.0, 0]
+    assert list(reasons[1:]) == ["OK", "No capital left"]
+
+
+def test_amount_is_truncated_to_tick_size():
+    quantities, reasons = size([60000.0], [59400.0], usdt_free=1000.0, amount_steps=[0.00001])
+    assert quantities[0] == 0.01666
+    assert reasons[0] == "OK"
+
+
+def test_precision_step_follows_precision_mode(monkeypatch):
+    market = {'precision': {'amount': 0.001}}
+    monkeypatch.setattr(bot, 'exchange', type('Exchange', (), {'precisionMode': bot.ccxt.TICK_SIZE})())
+    assert bot.precision_step(market, 'amount') == 0.001
+    monkeypatch.setattr(bot, 'exchange', type('Exchange', (), {'precisionMode': bot.ccxt.DECIMAL_PLACES})())
+    assert bot.precision_step({'precision': {'amount': 3}}, 'amount') == pytest.approx(0.001)
+    assert np.isnan(bot.precision_step(None, 'amount'))
+
+
+def test_unselected_signals_report_no_slot():
+    quantities, reasons = size([100.0, 100.0], [90.0, 90.0], max_positions=1)
+    assert quantities[0] == 0.3
+    assert reasons[1] == "Maximum positions reached"
+
+
+def test_missing_market_data_keeps_dollar_floor():
+    quantities, reasons = size([100.0], [98.0], usdt_free=0.5, amount_steps=[np.nan], min_notionals=[np.nan])
+    assert quantities[0] == 0
+    assert reasons[0].startswith("Order too small")
+
+
+def test_no_balance():
+    quantities, reasons = size([100.0], [98.0], usdt_free=0)
+    assert quantities[0] == 0
+    assert reasons[0] == "Insufficient balance"
+
+
+# ============= BATCH WEBHOOK =============
+def test_batch_reserves_and_releases_slots(monkeypatch):
+    monkeypatch.setattr(bot, 'check_account_limits', lambda: (True, "OK"))
+    monkeypatch.setattr(bot, 'get_balance', lambda: {'usdt_free': 100.0, 'usdt_total': 100.0})
+    monkeypatch.setattr(bot, 'log_message', lambda message: None)
+    monkeypatch.setattr(bot, 'exchange', type('Exchange', (), {'load_markets': lambda self: {}})())
+    monkeypatch.setattr(bot, 'active_orders', {})
+
+    seen = []
+
+    def place_order(symbol, side, quantity, entry_price, sl_price, tp_price):
+        seen.append(bot.pending_slots)
+        return {'id': symbol}
+
+    monkeypatch.setattr(bot, 'place_order', place_order)
+
+    response = bot.app.test_client().post('/webhook/batch', json={'signals': [
+        {'symbol': 'BTCUSD', 'action': 'BUY', 'price': 100, 'sl': 90},
+        {'symbol': 'ETHUSD', 'action': 'BUY', 'price': 100, 'sl': 100}
+    ]})
+
+    assert response.get_json()['placed'] == 1
+    # the slot of the unsized signal is released before submission
+    assert seen == [1]
+    assert bot.pending_slots == 0
+
+
+def test_malformed_signal_only_fails_its_entry(monkeypatch):
+    monkeypatch.setattr(bot, 'check_account_limits', lambda: (True, "OK"))
+    monkeypatch.setattr(bot, 'get_balance', lambda: {'usdt_free': 0, 'usdt_total': 0})
+    monkeypatch.setattr(bot, 'log_message', lambda message: None)
+
+    response = bot.app.test_client().post('/webhook/batch', json={'signals': [
+        "BTCUSD",
+        {'symbol': 'BTCUSD', 'action': None, 'price': 100},
+        {'symbol': 'ETHUSD', 'action': 'BUY', 'price': 'abc'}
+    ]})
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [r['status'] for r in results] == ["error", "error", "error"]
+    assert all(r['reason'].startswith("Invalid signal") for r in results)
+
+
+# ============= P&L / RISK ANALYTICS =============
+def test_trade_window_evicts_oldest():
+    window = TradeWindow(3)
+    for pnl in [5.0, -2.0, 3.0, -4.0]:
+        window.add(pnl)
+    # 5.0 is evicted, window holds -2, 3, -4
+    snap = window.snapshot()
+    assert snap["trades"] == 3
+    assert snap["win_rate"] == 33.33
+    assert snap["expectancy_usdt"] == -1.0
+    assert snap["avg_win_usdt"] == 3.0
+    assert snap["avg_loss_usdt"] == -3.0
+
+
+def test_exposure_and_unrealized_follow_marks():
+    analytics = PnLAnalytics()
+    analytics.open_position('a', 'BTC/USDT', 'buy', 1.0, 100.0)
+    analytics.open_position('b', 'BTC/USDT', 'sell', 2.0, 100.0)
+    analytics.open_position('c', 'ETH/USDT', 'buy', 1.0, 50.0)
+    analytics.update_price('a', 110.0)
+    analytics.update_price('b', 110.0)
+
+    snap = analytics.snapshot()
+    assert snap["exposure_usdt"] == {"BTC/USDT": 330.0, "ETH/USDT": 50.0}
+    assert snap["unrealized_pnl_usdt"] == -10.0
+
+    analytics.close_position('b', -20.0)
+    snap = analytics.snapshot()
+    assert snap["exposure_usdt"] == {"BTC/USDT": 110.0, "ETH/USDT": 50.0}
+    assert snap["unrealized_pnl_usdt"] == 10.0
+    assert snap["realized_pnl_usdt"] == -20.0
+
+    analytics.discard_position('a')
+    analytics.discard_position('missing')
+    assert analytics.snapshot()["exposure_usdt"] == {"ETH/USDT": 50.0}
+
+
+def test_reopening_order_id_replaces_position():
+    analytics = PnLAnalytics()
+    analytics.open_position('a', 'BTC/USDT', 'buy', 1.0, 100.0)
+    analytics.update_price('a', 120.0)
+    analytics.open_position('a', 'BTC/USDT', 'buy', 0.5, 100.0)
+
+    snap = analytics.snapshot()
+    assert len(snap["positions"]) == 1
+    assert snap["exposure_usdt"] == {"BTC/USDT": 50.0}
+    assert snap["unrealized_pnl_usdt"] == 0.0
+
+
+def test_drawdown_and_reset():
+    analytics = PnLAnalytics()
+    analytics.open_position('a', 'BTC/USDT', 'buy', 1.0, 100.0)
+    analytics.update_price('a', 110.0)
+    analytics.record_equity()
+    analytics.update_price('a', 95.0)
+    analytics.record_equity()
+    assert analytics.current_drawdown() == 15.0
+    assert analytics.snapshot()["max_drawdown_usdt"] == 15.0
+
+    analytics.reset_drawdown()
+    assert analytics.current_drawdown() == 0
+    analytics.update_price('a', 90.0)
+    analytics.record_equity()
+    assert analytics.current_drawdown() == 5.0
+    assert analytics.snapshot()["max_drawdown_usdt"] == 5.0
+
+
+def test_equity_curve_skips_unchanged_points():
+    analytics = PnLAnalytics()
+    analytics.record_equity()
+    analytics.record_equity()
+    analytics.close_position('x', 2.0)
+    analytics.record_equity()
+    analytics.record_equity()
+    assert [p["equity_usdt"] for p in analytics.snapshot()["equity_curve"]] == [0.0, 2.0]
+
+
+def test_account_limits_reject_at_max_drawdown(monkeypatch):
+    analytics = PnLAnalytics()
+    monkeypatch.setattr(bot, 'analytics', analytics)
+    monkeypatch.setattr(bot, 'MAX_DRAWDOWN_USDT', 10.0)
+    monkeypatch.setattr(bot, 'TRADING_ENABLED', True)
+    monkeypatch.setattr(bot, 'daily_pnl_usdt', 0)
+    monkeypatch.setattr(bot, 'MAX_DAILY_LOSS_USDT', 1000.0)
+
+    analytics.close_position('a', -9.0)
+    assert bot.check_account_limits()[0] is True
+
+    analytics.close_position('b', -1.0)
+    is_safe, msg = bot.check_account_limits()
+    assert is_safe is False
+    assert "Drawdown limit" in msg
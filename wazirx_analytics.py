@@ -0,0 +1,181 @@
+# wazirx_analytics.py
+import threading
+from collections import deque
+from datetime import datetime
+
+
+# ============= SLIDING TRADE WINDOW =============
+class TradeWindow:
+    def __init__(self, size):
+        self.size = size
+        self.trades = deque()
+        self.total = 0.0
+        self.wins = 0
+        self.win_total = 0.0
+        self.loss_total = 0.0
+
+    def _apply(self, pnl, sign):
+        self.total += sign * pnl
+        if pnl > 0:
+            self.wins += sign
+            self.win_total += sign * pnl
+        else:
+            self.loss_total += sign * pnl
+
+    def add(self, pnl):
+        if len(self.trades) == self.size:
+            self._apply(self.trades.popleft(), -1)
+        self.trades.append(pnl)
+        self._apply(pnl, 1)
+
+    def snapshot(self):
+        count = len(self.trades)
+        losses = count - self.wins
+        return {
+            "window": self.size,
+            "trades": count,
+            "win_rate": round(self.wins / count * 100, 2) if count else 0,
+            "expectancy_usdt": round(self.total / count, 4) if count else 0,
+            "avg_win_usdt": round(self.win_total / self.wins, 4) if self.wins else 0,
+            "avg_loss_usdt": round(self.loss_total / losses, 4) if losses else 0
+        }
+
+
+# ============= P&L / RISK ANALYTICS =============
+# Every update is O(1): totals are adjusted by deltas instead of being
+# recomputed from open positions or trade history. Position updates do not
+# touch the equity curve; the caller takes one equity point per monitor
+# sweep with record_equity(), once all marks are in, so peak and drawdown
+# never see a half-updated set of prices. A curve point is only appended
+# when equity changed, so idle sweeps do not fill the curve with duplicates.
+class PnLAnalytics:
+    def __init__(self, windows=(10, 50), equity_points=500):
+        self.lock = threading.Lock()
+        self.positions = {}
+        self.exposure = {}
+        self.symbol_counts = {}
+        self.unrealized_total = 0.0
+        self.realized_total = 0.0
+        self.peak_equity = 0.0
+        self.max_drawdown = 0.0
+        self.equity_curve = deque(maxlen=equity_points)
+        self.windows = [TradeWindow(size) for size in windows]
+
+    def _equity(self):
+        return self.realized_total + self.unrealized_total
+
+    def _record_equity(self):
+        equity = self._equity()
+        if equity > self.peak_equity:
+            self.peak_equity = equity
+        drawdown = self.peak_equity - equity
+        if drawdown > self.max_drawdown:
+            self.max_drawdown = drawdown
+        if self.equity_curve and self.equity_curve[-1][1] == round(equity, 4):
+            return
+        self.equity_curve.append((datetime.now().strftime("%Y-%m-%d %H:%M:%S"), round(equity, 4)))
+
+    def _mark(self, position, price):
+        if position['side'] == 'buy':
+            unrealized = (price - position['entry_price']) * position['quantity']
+        else:
+            unrealized = (position['entry_price'] - price) * position['quantity']
+        exposure = position['quantity'] * price
+
+        self.unrealized_total += unrealized - position['unrealized']
+        symbol = position['symbol']
+        self.exposure[symbol] = self.exposure.get(symbol, 0.0) + exposure - position['exposure']
+
+        position['mark_price'] = price
+        position['unrealized'] = unrealized
+        position['exposure'] = exposure
+
+    def _remove(self, order_id):
+        position = self.positions.pop(order_id, None)
+        if position is None:
+            return None
+
+        self.unrealized_total -= position['unrealized']
+        symbol = position['symbol']
+        self.symbol_counts[symbol] -= 1
+        if self.symbol_counts[symbol] == 0:
+            del self.symbol_counts[symbol]
+            self.exposure.pop(symbol, None)
+        else:
+            self.exposure[symbol] -= position['exposure']
+        return position
+
+    def open_position(self, order_id, symbol, side, quantity, entry_price):
+        with self.lock:
+            self._remove(order_id)
+            position = {
+                'symbol': symbol,
+                'side': side,
+                'quantity': float(quantity),
+                'entry_price': float(entry_price),
+                'mark_price': float(entry_price),
+                'unrealized': 0.0,
+                'exposure': 0.0
+            }
+            self.positions[order_id] = position
+            self.symbol_counts[symbol] = self.symbol_counts.get(symbol, 0) + 1
+            self._mark(position, float(entry_price))
+
+    def update_price(self, order_id, price):
+        with self.lock:
+            position = self.positions.get(order_id)
+            if position is None or not price:
+                return
+            self._mark(position, float(price))
+
+    def close_position(self, order_id, pnl):
+        with self.lock:
+            self._remove(order_id)
+            self.realized_total += pnl
+            for window in self.windows:
+                window.add(pnl)
+
+    def discard_position(self, order_id):
+        with self.lock:
+            self._remove(order_id)
+
+    def record_equity(self):
+        with self.lock:
+            self._record_equity()
+
+    def reset_drawdown(self):
+        with self.lock:
+            self.peak_equity = self._equity()
+            self.max_drawdown = 0.0
+
+    def current_drawdown(self):
+        with self.lock:
+            return self.peak_equity - self._equity()
+
+    def snapshot(self, curve_points=100):
+        with self.lock:
+            equity = self._equity()
+            curve = list(self.equity_curve)[-curve_points:] if curve_points > 0 else []
+            return {
+                "equity_usdt": round(equity, 4),
+                "realized_pnl_usdt": round(self.realized_total, 4),
+                "unrealized_pnl_usdt": round(self.unrealized_total, 4),
+                "peak_equity_usdt": round(self.peak_equity, 4),
+                "current_drawdown_usdt": round(self.peak_equity - equity, 4),
+                "max_drawdown_usdt": round(self.max_drawdown, 4),
+                "exposure_usdt": {symbol: round(value, 4) for symbol, value in self.exposure.items()},
+                "positions": [
+                    {
+                        "order_id": order_id,
+                        "symbol": p['symbol'],
+                        "side": p['side'],
+                        "quantity": p['quantity'],
+                        "entry_price": p['entry_price'],
+                        "mark_price": p['mark_price'],
+                        "unrealized_pnl_usdt": round(p['unrealized'], 4)
+                    }
+                    for order_id, p in self.positions.items()
+                ],
+                "windows": [window.snapshot() for window in self.windows],
+                "equity_curve": [{"time": t, "equity_usdt": e} for t, e in curve]
+            }
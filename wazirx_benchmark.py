@@ -0,0 +1,368 @@
+# wazirx_benchmark.py
+# Hot path benchmarks for wazirx_bot against a mocked ccxt exchange.
+#
+#   python wazirx_benchmark.py run --output benchmark_baseline.json
+#   python wazirx_benchmark.py run --output benchmark_current.json
+#   python wazirx_benchmark.py compare benchmark_baseline.json benchmark_current.json --threshold 10
+#
+# Each benchmark runs once as warmup, then --repeats times. The median run is
+# kept and the spread of the repeats, (max - min) / median, is stored with it.
+# compare exits with code 1 when any benchmark got worse than both the
+# threshold (%) and the spread of either run, is missing from the current
+# run, or the two runs differ in --quick.
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import wazirx_bot as bot
+
+
+# ============= MOCK EXCHANGE =============
+class MockExchange:
+    # Same precision mode as ccxt's wazirx: precision values are step sizes
+    precisionMode = bot.ccxt.TICK_SIZE
+
+    def __init__(self, price=100.0, usdt_free=1000.0):
+        self.price = price
+        self.usdt_free = usdt_free
+        self.order_counter = 0
+        self.counter_lock = threading.Lock()
+        self.markets = {
+            symbol: {
+                'symbol': symbol,
+                'precision': {'amount': 0.0001, 'price': 0.0001},
+                'limits': {'cost': {'min': 1.0}}
+            }
+            for symbol in bot.ALLOWED_SYMBOLS
+        }
+
+    def _next_id(self):
+        with self.counter_lock:
+            self.order_counter += 1
+            return f'MOCK_{self.order_counter}'
+
+    def fetch_balance(self):
+        return {'USDT': {'free': self.usdt_free, 'total': self.usdt_free}}
+
+    def fetch_ticker(self, symbol):
+        return {'symbol': symbol, 'last': self.price}
+
+    def load_markets(self):
+        return self.markets
+
+    def create_limit_order(self, symbol, side, amount, price):
+        return {'id': self._next_id(), 'symbol': symbol, 'side': side, 'amount': amount, 'price': price, 'status': 'open'}
+
+    def create_market_order(self, symbol, side, amount):
+        return {'id': self._next_id(), 'symbol': symbol, 'side': side, 'amount': amount, 'status': 'closed'}
+
+    def fetch_order(self, order_id, symbol):
+        return {'id': order_id, 'symbol': symbol, 'status': 'open', 'filled': 0}
+
+    def cancel_order(self, order_id, symbol):
+        return {'id': order_id, 'status': 'canceled'}
+
+
+# ============= HELPERS =============
+def setup_bot(log_path):
+    bot.exchange = MockExchange()
+    bot.TRADING_ENABLED = True
+    bot.TRADING_24_7 = True
+    bot.DRY_RUN = False
+    bot.TELEGRAM_ENABLED = False
+    bot.LOG_TRADES_TO_FILE = True
+    bot.LOG_FILE_PATH = log_path
+    bot.MIN_BALANCE_USDT = 0
+    bot.RISK_PER_TRADE_PERCENT = 1
+    bot.MAX_DAILY_LOSS_USDT = float('inf')
+    bot.MAX_DRAWDOWN_USDT = float('inf')
+    reset_state()
+
+
+def reset_state():
+    with bot.data_lock:
+        bot.active_orders.clear()
+        bot.daily_pnl_usdt = 0
+        bot.total_trades_today = 0
+        bot.winning_trades_today = 0
+        bot.losing_trades_today = 0
+    bot.analytics = bot.PnLAnalytics(windows=bot.ANALYTICS_WINDOWS, equity_points=bot.ANALYTICS_EQUITY_POINTS)
+
+
+def fill_positions(count):
+    reset_state()
+    symbols = bot.ALLOWED_SYMBOLS
+    with bot.data_lock:
+        for i in range(count):
+            bot.active_orders[f'BENCH_{i}'] = {
+                'symbol': symbols[i % len(symbols)],
+                'side': 'buy',
+                'quantity': 1.0,
+                'entry_price': 100.0,
+                'sl_price': 90.0,
+                'tp_price': 110.0,
+                'timestamp': datetime.now(),
+                'status': 'filled',
+                'filled_quantity': 1.0
+            }
+    for order_id, order_info in list(bot.active_orders.items()):
+        bot.analytics.open_position(order_id, order_info['symbol'], 'buy', 1.0, 100.0)
+
+
+def latency_stats(samples):
+    samples = sorted(samples)
+    return {
+        "samples": len(samples),
+        "mean_ms": round(statistics.mean(samples) * 1000, 4),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 4),
+        "p95_ms": round(samples[min(int(len(samples) * 0.95), len(samples) - 1)] * 1000, 4),
+        "max_ms": round(samples[-1] * 1000, 4)
+    }
+
+
+def result(value, unit, higher_is_better, **extra):
+    return {"value": round(value, 4), "unit": unit, "higher_is_better": higher_is_better, "extra": extra}
+
+
+# ============= BENCHMARKS =============
+def bench_webhook(iterations):
+    client = bot.app.test_client()
+    payload = {'symbol': 'BTCUSD', 'action': 'BUY', 'price': 100.0}
+    samples = []
+    for _ in range(iterations):
+        reset_state()
+        start = time.perf_counter()
+        response = client.post('/webhook', json=payload)
+        samples.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"webhook returned {response.status_code}: {response.get_json()}")
+    stats = latency_stats(samples)
+    return result(stats['p50_ms'], 'ms', False, **stats)
+
+
+def bench_position_size(iterations):
+    start = time.perf_counter()
+    for i in range(iterations):
+        bot.calculate_position_size('BTC/USDT', 100.0 + (i % 10), 98.0)
+    elapsed = time.perf_counter() - start
+    return result(iterations / elapsed, 'ops/s', True, iterations=iterations, elapsed_s=round(elapsed, 4))
+
+
+def bench_monitor_sweep(positions, sweeps):
+    fill_positions(positions)
+    samples = []
+    for _ in range(sweeps):
+        start = time.perf_counter()
+        bot.monitor_active_orders()
+        samples.append(time.perf_counter() - start)
+    if len(bot.active_orders) != positions:
+        raise RuntimeError("monitor sweep closed positions, mock prices are off")
+    stats = latency_stats(samples)
+    reset_state()
+    return result(stats['p50_ms'], 'ms', False, positions=positions, **stats)
+
+
+def bench_log_contention(threads, messages):
+    def worker(n):
+        for i in range(messages):
+            bot.log_message(f"bench thread {n} message {i}")
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    total = threads * messages
+    return result(total / elapsed, 'msg/s', True, threads=threads, messages=total, elapsed_s=round(elapsed, 4))
+
+
+def bench_positions_contention(readers, reads, positions):
+    fill_positions(positions)
+    stop = threading.Event()
+    samples_lock = threading.Lock()
+    samples = []
+    errors = []
+
+    def writer():
+        while not stop.is_set():
+            bot.monitor_active_orders()
+
+    def reader():
+        try:
+            client = bot.app.test_client()
+            local = []
+            for _ in range(reads):
+                start = time.perf_counter()
+                response = client.get('/positions')
+                local.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise RuntimeError(f"/positions returned {response.status_code}")
+            with samples_lock:
+                samples.extend(local)
+        except Exception as e:
+            with samples_lock:
+                errors.append(e)
+
+    writer_thread = threading.Thread(target=writer, daemon=True)
+    reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+    writer_thread.start()
+    start = time.perf_counter()
+    for r in reader_threads:
+        r.start()
+    for r in reader_threads:
+        r.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    writer_thread.join()
+    reset_state()
+
+    if errors:
+        raise RuntimeError(f"{len(errors)}/{readers} reader thread(s) failed: {errors[0]}")
+
+    stats = latency_stats(samples)
+    return result(stats['p95_ms'], 'ms', False, readers=readers, positions=positions,
+                  reads_per_s=round(len(samples) / elapsed, 2), **stats)
+
+
+# ============= RUN / COMPARE =============
+def measure(bench, repeats, warmup=1):
+    for _ in range(warmup):
+        bench()
+    runs = sorted((bench() for _ in range(repeats)), key=lambda r: r["value"])
+    median = runs[len(runs) // 2]
+    values = [r["value"] for r in runs]
+    spread = (values[-1] - values[0]) / median["value"] * 100 if median["value"] else 0.0
+    median["spread_pct"] = round(spread, 2)
+    median["repeats"] = values
+    return median
+
+
+def run_benchmarks(quick=False, repeats=5):
+    scale = 0.1 if quick else 1
+    n = lambda value: max(int(value * scale), 1)
+
+    benchmarks = [
+        ("webhook_latency", lambda: bench_webhook(n(200))),
+        ("position_size_throughput", lambda: bench_position_size(n(5000))),
+    ]
+    for positions in (10, 100, 1000):
+        sweeps = n(50 if positions < 1000 else 10)
+        benchmarks.append((f"monitor_sweep_{positions}", lambda p=positions, s=sweeps: bench_monitor_sweep(p, s)))
+    benchmarks += [
+        ("log_message_contention", lambda: bench_log_contention(8, n(2000))),
+        ("positions_read_contention", lambda: bench_positions_contention(4, n(200), 100)),
+    ]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        setup_bot(os.path.join(tmp_dir, "bench.log"))
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for name, bench in benchmarks:
+                results[name] = measure(bench, repeats)
+
+    return {
+        "meta": {
+            "time": str(datetime.now()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": quick,
+            "repeats": repeats
+        },
+        "results": results
+    }
+
+
+def compare_results(baseline, current, threshold):
+    rows = []
+    regressions = []
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if cur is None:
+            rows.append((name, base["value"], None, None, None, "MISSING"))
+            regressions.append(name)
+            continue
+
+        if base["value"] == 0:
+            change = 0.0
+        else:
+            change = (cur["value"] - base["value"]) / base["value"] * 100
+        worse_by = -change if base["higher_is_better"] else change
+        # Differences inside the run-to-run spread of either side are noise
+        noise = max(base.get("spread_pct", 0), cur.get("spread_pct", 0))
+        limit = max(threshold, noise)
+
+        if worse_by > limit:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif worse_by < -limit:
+            status = "improved"
+        elif abs(worse_by) > threshold:
+            status = "ok (noise)"
+        else:
+            status = "ok"
+        rows.append((name, base["value"], cur["value"], change, noise, status))
+
+    for name, base_value, cur_value, change, noise, status in rows:
+        unit = baseline["results"][name]["unit"]
+        if cur_value is None:
+            print(f"{name:<28} {base_value:>14} {'-':>14} {'-':>9} {'-':>9}  {status}")
+        else:
+            print(f"{name:<28} {base_value:>14} {cur_value:>14} {change:>+8.1f}% {'±' + format(noise, '.1f'):>8}%  {status}  ({unit})")
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="WazirX bot hot path benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run benchmarks and save results as JSON")
+    run_parser.add_argument("--output", default="benchmark_baseline.json")
+    run_parser.add_argument("--quick", action="store_true", help="10x fewer iterations")
+    run_parser.add_argument("--repeats", type=int, default=5, help="Runs per benchmark after warmup, median is kept")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="Allowed slowdown in percent")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        data = run_benchmarks(quick=args.quick, repeats=max(args.repeats, 1))
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        for name, res in data["results"].items():
+            print(f"{name:<28} {res['value']:>14} {res['unit']:<6} ±{res['spread_pct']}%")
+        print(f"✅ Results saved to {args.output}")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    if baseline["meta"].get("quick") != current["meta"].get("quick"):
+        print("❌ Cannot compare a --quick run with a full run, re-run both the same way")
+        return 1
+
+    regressions = compare_results(baseline, current, args.threshold)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) or missing benchmark(s): {', '.join(regressions)}")
+        return 1
+    print("✅ No regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,16 @@
 from flask import Flask, request, jsonify
 import ccxt
+import numpy as np
+import math
 from wazirx_config import *
+from wazirx_analytics import PnLAnalytics
 from datetime import datetime, timedelta
 import json
 import time
 import requests
 import threading
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 import os
 from dotenv import load_dotenv
@@ -24,7 +29,19 @@ DEFAULT_SL_PERCENT = 2.0
 DEFAULT_TP_PERCENT = 4.0
 
 # WazirX Exchange Setup
-exchange = ccxt.wazirx({
+# ccxt's throttle() keeps lastRestRequestTimestamp without a lock, so
+# requests from several threads (monitor, Flask, batch workers) would skip
+# enableRateLimit. All REST requests on this client go through one lock.
+class LockedWazirx(ccxt.wazirx):
+    def __init__(self, config={}):
+        super().__init__(config)
+        self.request_lock = threading.RLock()
+
+    def fetch2(self, *args, **kwargs):
+        with self.request_lock:
+            return super().fetch2(*args, **kwargs)
+
+exchange = LockedWazirx({
     'apiKey': os.getenv('WAZIRX_API_KEY'),
     'secret': os.getenv('WAZIRX_SECRET_KEY'),
     'enableRateLimit': True,
@@ -45,6 +62,11 @@ losing_trades_today = 0
 
 # Active orders
 active_orders = {}
+pending_slots = 0  # Position slots reserved by batches still submitting
+dry_run_counter = itertools.count(1)
+
+# Rolling P&L / risk analytics (has its own lock)
+analytics = PnLAnalytics(windows=ANALYTICS_WINDOWS, equity_points=ANALYTICS_EQUITY_POINTS)
 
 # ============= RETRY DECORATOR =============
 def retry_on_failure(max_retries=3, delay=2):
@@ -134,9 +156,20 @@ def reset_daily_tracker():
         winning_trades_today = 0
         losing_trades_today = 0
         last_reset_date = datetime.now().date()
+        analytics.reset_drawdown()
+
+# ============= SYMBOL MAPPING =============
+def resolve_symbol(tv_symbol):
+    if tv_symbol in SYMBOL_MAP:
+        return SYMBOL_MAP[tv_symbol]
+    elif '/' in tv_symbol:
+        return tv_symbol  # Already formatted
+    else:
+        return f"{tv_symbol}/USDT"  # Add /USDT only if missing
 
 # ============= SAFETY CHECKS =============
-def check_safety_limits(data):
+# Account-wide checks, shared by single and batch signals
+def check_account_limits():
     reset_daily_tracker()
 
     if not TRADING_ENABLED:
@@ -146,15 +179,27 @@ def check_safety_limits(data):
         if abs(daily_pnl_usdt) >= MAX_DAILY_LOSS_USDT:
             return False, f"❌ Daily loss limit reached: ${abs(daily_pnl_usdt):.2f}"
 
-    with data_lock:
-        if len(active_orders) >= MAX_OPEN_POSITIONS:
-            return False, f"❌ Maximum positions reached: {len(active_orders)}/{MAX_OPEN_POSITIONS}"
+    drawdown = analytics.current_drawdown()
+    if drawdown >= MAX_DRAWDOWN_USDT:
+        return False, f"❌ Drawdown limit reached: ${drawdown:.2f}"
+
+    if not TRADING_24_7:
+        current_hour = datetime.now().hour
+        if current_hour in RESTRICTED_HOURS:
+            return False, f"❌ Trading restricted at {current_hour}:00 IST"
 
-    symbol = data.get('symbol', '')
-    mapped_symbol = SYMBOL_MAP.get(symbol, symbol)
-    if '/' not in mapped_symbol:
-        mapped_symbol += '/USDT'
+    return True, "✅ Account checks passed"
 
+def check_safety_limits(data):
+    is_safe, msg = check_account_limits()
+    if not is_safe:
+        return False, msg
+
+    with data_lock:
+        if len(active_orders) + pending_slots >= MAX_OPEN_POSITIONS:
+            return False, f"❌ Maximum positions reached: {len(active_orders) + pending_slots}/{MAX_OPEN_POSITIONS}"
+
+    mapped_symbol = resolve_symbol(data.get('symbol', ''))
     if mapped_symbol not in ALLOWED_SYMBOLS:
         return False, f"❌ Symbol not allowed: {mapped_symbol}"
 
@@ -162,11 +207,6 @@ def check_safety_limits(data):
     if balance['usdt_free'] < MIN_BALANCE_USDT:
         return False, f"❌ Insufficient balance: ${balance['usdt_free']:.2f}"
 
-    if not TRADING_24_7:
-        current_hour = datetime.now().hour
-        if current_hour in RESTRICTED_HOURS:
-            return False, f"❌ Trading restricted at {current_hour}:00 IST"
-
     return True, "✅ All safety checks passed"
 
 # ============= CALCULATE POSITION SIZE =============
@@ -197,13 +237,13 @@ def calculate_position_size(symbol, entry_price, stop_loss_price):
         market = markets.get(symbol)
 
         if market:
-            precision = market.get('precision', {}).get('amount', 4)
-            quantity = round(quantity, precision)
+            amount_step = precision_step(market, 'amount')
+            quantity = float(round_to_step(quantity, amount_step))
             
-            min_notional = market.get('limits', {}).get('cost', {}).get('min', 1.0)
+            min_notional = market.get('limits', {}).get('cost', {}).get('min') or 1.0
             if (quantity * entry_price) < min_notional:
                 quantity = available_capital / entry_price
-                quantity = round(quantity, precision)
+                quantity = float(round_to_step(quantity, amount_step))
 
         if (quantity * entry_price) < 1.0:
             return 0, f"Order too small (${round(quantity * entry_price, 2)})"
@@ -214,12 +254,119 @@ def calculate_position_size(symbol, entry_price, stop_loss_price):
         log_message(f"❌ Position size calculation error: {e}")
         return 0, str(e)
 
+# ============= AMOUNT / PRICE PRECISION =============
+# Step size for market['precision'][key]. ccxt's wazirx uses TICK_SIZE, where
+# the value already is the step (0.00001); DECIMAL_PLACES exchanges give a
+# number of decimals. NaN means unknown, i.e. no rounding.
+def precision_step(market, key):
+    value = (market or {}).get('precision', {}).get(key)
+    if value is None:
+        return np.nan
+    if getattr(exchange, 'precisionMode', ccxt.DECIMAL_PLACES) == ccxt.TICK_SIZE:
+        return float(value)
+    return 10.0 ** -value
+
+# Rounds down to a multiple of the step (like ccxt's TRUNCATE), or to the
+# nearest step with floor=False. Works on scalars and arrays; scalars skip
+# NumPy, which is several times slower than plain floats for one value.
+def round_to_step(values, steps, floor=True):
+    if isinstance(values, (int, float)) and isinstance(steps, (int, float)):
+        value, step = float(values), float(steps)
+        if not step > 0:
+            return value
+        units = math.floor(value / step + 1e-9) if floor else round(value / step)
+        return round(units * step, 12)
+
+    values = np.asarray(values, dtype=float)
+    steps = np.asarray(steps, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        units = np.floor(values / steps + 1e-9) if floor else np.round(values / steps)
+        rounded = np.round(units * steps, 12)
+    return np.where(np.isnan(steps) | ~(steps > 0), values, rounded)
+
+# ============= BATCH POSITION SIZING =============
+# Sizes all signals of a batch together over one balance and market snapshot.
+# Signals must already be sorted by priority. Every signal asks for the same
+# risk as a single /webhook trade (RISK_PER_TRADE_PERCENT of free capital),
+# but the batch as a whole may not risk more than BATCH_MAX_RISK_PERCENT.
+# Both that risk budget and the free capital are handed out in priority
+# order, to at most max_positions signals.
+#
+# A signal that fails while capital was available to it (bad SL, invalid
+# quantity, below min notional) is dropped and sizing runs again, so its
+# slot, risk and capital go to the next signal. Signals that only got
+# nothing because higher priorities used up the budget are marked once no
+# other signal fails.
+#
+# Differences from calculate_position_size(): an order below the market's
+# min notional is rejected instead of being raised to the whole free
+# balance, since that capital is shared by the batch.
+def calculate_batch_position_sizes(entry_prices, stop_loss_prices, usdt_free, amount_steps, min_notionals, max_positions):
+    entry_prices = np.asarray(entry_prices, dtype=float)
+    stop_loss_prices = np.asarray(stop_loss_prices, dtype=float)
+    amount_steps = np.asarray(amount_steps, dtype=float)
+    min_notionals = np.maximum(np.nan_to_num(np.asarray(min_notionals, dtype=float), nan=1.0), 1.0)
+
+    quantities = np.zeros(len(entry_prices))
+    reasons = np.full(len(entry_prices), "OK", dtype=object)
+
+    available_capital = max(float(usdt_free), 0)
+    if available_capital <= 0:
+        reasons[:] = "Insufficient balance"
+        return quantities, reasons
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sl_distance = np.abs(entry_prices - stop_loss_prices) / entry_prices
+    invalid_sl = ~(sl_distance > 0)
+    reasons[invalid_sl] = "Invalid SL distance"
+
+    active = ~invalid_sl
+    risk_per_trade = available_capital * (RISK_PER_TRADE_PERCENT / 100)
+    risk_budget = available_capital * (BATCH_MAX_RISK_PERCENT / 100)
+
+    while True:
+        selected = np.flatnonzero(active)[:max(int(max_positions), 0)]
+        if len(selected) == 0:
+            break
+
+        risk_wanted = np.full(len(selected), risk_per_trade)
+        risk_amount = np.clip(risk_budget - (np.cumsum(risk_wanted) - risk_wanted), 0, risk_wanted)
+        desired_usdt = np.minimum(risk_amount / sl_distance[selected], available_capital)
+        position_usdt = np.clip(available_capital - (np.cumsum(desired_usdt) - desired_usdt), 0, desired_usdt)
+
+        prices = entry_prices[selected]
+        quantity = round_to_step(position_usdt / prices, amount_steps[selected])
+        notional = quantity * prices
+
+        failed = ~np.isfinite(quantity) | (quantity <= 0) | (notional < min_notionals[selected])
+        starved = failed & (position_usdt <= 0)
+        hard_failed = failed & ~starved
+
+        if hard_failed.any():
+            for i, value, finite in zip(selected[hard_failed], notional[hard_failed], np.isfinite(quantity[hard_failed])):
+                reasons[i] = f"Order too small (${round(value, 2)})" if finite else "Invalid quantity"
+                active[i] = False
+            continue
+
+        quantities[selected] = np.where(failed, 0, quantity)
+        if starved.any():
+            # Budgets are handed out in order, so every later signal is starved too
+            for i, risk in zip(selected[starved], risk_amount[starved]):
+                reasons[i] = "No risk budget left" if risk <= 0 else "No capital left"
+            later = np.flatnonzero(active)[len(selected):]
+            reasons[later] = "No risk budget left" if risk_amount[-1] <= 0 else "No capital left"
+            active[later] = False
+        break
+
+    reasons[active & (quantities <= 0) & (reasons == "OK")] = "Maximum positions reached"
+    return quantities, reasons
+
 # ============= PLACE ORDER =============
 @retry_on_failure(max_retries=2, delay=3)
 def place_order(symbol, side, quantity, entry_price, sl_price, tp_price):
     try:
         if DRY_RUN:
-            order_id = f'DRY_RUN_{int(time.time())}'
+            order_id = f'DRY_RUN_{int(time.time())}_{next(dry_run_counter)}'
             log_message(f"🔍 DRY RUN: Would place {side.upper()} {quantity} {symbol} @ ${entry_price}")
 
             with data_lock:
@@ -235,6 +382,8 @@ def place_order(symbol, side, quantity, entry_price, sl_price, tp_price):
                     'filled_quantity': quantity
                 }
 
+            analytics.open_position(order_id, symbol, side, quantity, entry_price)
+
             return {
                 'id': order_id,
                 'status': 'dry_run',
@@ -252,9 +401,7 @@ def place_order(symbol, side, quantity, entry_price, sl_price, tp_price):
         markets = exchange.load_markets()
         market = markets.get(symbol)
         if market:
-            price_precision = market.get('precision', {}).get('price')
-            if price_precision is not None:
-                limit_price = round(limit_price, price_precision)
+            limit_price = float(round_to_step(limit_price, precision_step(market, 'price'), floor=False))
 
         order = exchange.create_limit_order(
             symbol=symbol,
@@ -333,6 +480,8 @@ def close_position(order_id, order_info, reason):
             else:
                 losing_trades_today += 1
 
+        analytics.close_position(order_id, pnl)
+
         log_message(f"🔔 Position closed: {reason} | P&L: ${pnl:.2f}")
 
         emoji = "✅" if pnl > 0 else "❌"
@@ -389,6 +538,7 @@ def monitor_active_orders():
                     with data_lock:
                         if order_id in active_orders:
                             del active_orders[order_id]
+                    analytics.discard_position(order_id)
                     continue
 
                 current_price = get_current_price(symbol)
@@ -399,15 +549,19 @@ def monitor_active_orders():
                     try:
                         order_status = exchange.fetch_order(order_id, symbol)
                         if order_status['status'] in ['closed', 'filled']:
+                            filled_quantity = float(order_status.get('filled', order_info['quantity']))
                             with data_lock:
                                 active_orders[order_id]['status'] = 'filled'
-                                active_orders[order_id]['filled_quantity'] = float(order_status.get('filled', order_info['quantity']))
+                                active_orders[order_id]['filled_quantity'] = filled_quantity
+                            analytics.open_position(order_id, symbol, order_info['side'], filled_quantity, order_info['entry_price'])
                         else:
                             continue
                     except Exception as e:
                         log_message(f"⚠️ Order status check failed for {order_id}: {e}")
                         continue
 
+                analytics.update_price(order_id, current_price)
+
                 entry_price = order_info['entry_price']
                 sl_price = order_info['sl_price']
                 tp_price = order_info['tp_price']
@@ -440,6 +594,8 @@ def monitor_active_orders():
             except Exception as e:
                 log_message(f"❌ Error monitoring order {order_id}: {e}")
 
+        analytics.record_equity()
+
     except Exception as e:
         log_message(f"❌ Order monitoring error: {e}")
 
@@ -470,12 +626,7 @@ def webhook():
         tp = float(data.get('tp', 0))
 
         # ✅ FIXED SYMBOL HANDLING
-        if tv_symbol in SYMBOL_MAP:
-            symbol = SYMBOL_MAP[tv_symbol]
-        elif '/' in tv_symbol:
-            symbol = tv_symbol  # Already formatted
-        else:
-            symbol = f"{tv_symbol}/USDT"  # Add /USDT only if missing
+        symbol = resolve_symbol(tv_symbol)
 
         # Validation
         if action not in ['BUY', 'SELL']:
@@ -525,6 +676,184 @@ def webhook():
         log_message(f"❌ Webhook error: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
         
+# ============= BATCH WEBHOOK ENDPOINT =============
+# Accepts {"signals": [{"symbol", "action", "price", "sl", "tp", "priority"}, ...]}.
+# Signals are sized together, the highest priority ones that size fine get
+# the free position slots (ties keep payload order), and orders go out
+# concurrently. Exchange requests still run one at a time (LockedWazirx), so
+# the workers overlap order bookkeeping and Telegram, not the REST calls.
+@app.route('/webhook/batch', methods=['POST'])
+def webhook_batch():
+    try:
+        data = request.json or {}
+        signals = data.get('signals', []) if isinstance(data, dict) else data
+        if not isinstance(signals, list) or not signals:
+            return jsonify({"status": "error", "reason": "No signals in batch"}), 400
+
+        log_message("\n" + "="*80)
+        log_message(f"📨 BATCH ALERT RECEIVED | {len(signals)} signals | {datetime.now()}")
+        log_message(json.dumps(data, indent=2))
+        log_message("="*80)
+
+        is_safe, msg = check_account_limits()
+        if not is_safe:
+            log_message(msg)
+            return jsonify({"status": "rejected", "reason": msg}), 400
+
+        results = [None] * len(signals)
+        candidates = []
+
+        for index, signal in enumerate(signals):
+            result = {"index": index}
+            results[index] = result
+            if not isinstance(signal, dict):
+                result.update({"status": "error", "reason": "Invalid signal: not an object"})
+                continue
+
+            result["symbol"] = signal.get('symbol')
+            try:
+                action = signal.get('action', '').upper()
+                symbol = resolve_symbol(signal.get('symbol', ''))
+                price = float(signal.get('price', 0))
+                sl = float(signal.get('sl', 0))
+                tp = float(signal.get('tp', 0))
+                priority = float(signal.get('priority', 0))
+            except (TypeError, ValueError, AttributeError) as e:
+                result.update({"status": "error", "reason": f"Invalid signal: {e}"})
+                continue
+
+            result["symbol"] = symbol
+            if action not in ['BUY', 'SELL']:
+                result.update({"status": "error", "reason": "Invalid action"})
+                continue
+            if not price > 0:
+                result.update({"status": "error", "reason": "Invalid price"})
+                continue
+            if symbol not in ALLOWED_SYMBOLS:
+                result.update({"status": "error", "reason": f"Symbol not allowed: {symbol}"})
+                continue
+
+            if sl <= 0:
+                sl = price * (1 - DEFAULT_SL_PERCENT / 100) if action == 'BUY' else price * (1 + DEFAULT_SL_PERCENT / 100)
+            if tp <= 0:
+                tp = price * (1 + DEFAULT_TP_PERCENT / 100) if action == 'BUY' else price * (1 - DEFAULT_TP_PERCENT / 100)
+
+            candidates.append({
+                'index': index,
+                'symbol': symbol,
+                'side': 'buy' if action == 'BUY' else 'sell',
+                'price': price,
+                'sl': sl,
+                'tp': tp,
+                'priority': priority
+            })
+
+        candidates.sort(key=lambda c: -c['priority'])
+
+        # Reserve the free slots up front so an overlapping /webhook or batch
+        # cannot take them while this batch is sizing and submitting
+        global total_trades_today, pending_slots
+        with data_lock:
+            free_slots = max(MAX_OPEN_POSITIONS - len(active_orders) - pending_slots, 0)
+            pending_slots += free_slots
+        reserved = free_slots
+
+        def release_slots(count):
+            global pending_slots
+            with data_lock:
+                pending_slots -= count
+
+        try:
+            balance = get_balance()
+            if candidates and balance['usdt_free'] < MIN_BALANCE_USDT:
+                for candidate in candidates:
+                    results[candidate['index']].update({
+                        "status": "rejected",
+                        "reason": f"❌ Insufficient balance: ${balance['usdt_free']:.2f}"
+                    })
+                candidates = []
+
+            orders_to_place = []
+            if candidates:
+                markets = exchange.load_markets()
+                amount_steps, min_notionals = [], []
+                for candidate in candidates:
+                    market = markets.get(candidate['symbol'])
+                    amount_steps.append(precision_step(market, 'amount'))
+                    min_notionals.append((market or {}).get('limits', {}).get('cost', {}).get('min') or 1.0)
+
+                quantities, reasons = calculate_batch_position_sizes(
+                    [c['price'] for c in candidates],
+                    [c['sl'] for c in candidates],
+                    balance['usdt_free'],
+                    amount_steps,
+                    min_notionals,
+                    free_slots
+                )
+
+                for candidate, quantity, reason in zip(candidates, quantities, reasons):
+                    if quantity > 0:
+                        candidate['quantity'] = float(quantity)
+                        orders_to_place.append(candidate)
+                    elif reason == "Maximum positions reached":
+                        results[candidate['index']].update({
+                            "status": "rejected",
+                            "reason": f"❌ Maximum positions reached: {MAX_OPEN_POSITIONS}"
+                        })
+                    else:
+                        results[candidate['index']].update({"status": "error", "reason": f"Position size error: {reason}"})
+
+            release_slots(reserved - len(orders_to_place))
+            reserved = len(orders_to_place)
+
+            def submit(candidate):
+                try:
+                    return place_order(candidate['symbol'], candidate['side'], candidate['quantity'],
+                                       candidate['price'], candidate['sl'], candidate['tp']), None
+                except Exception as e:
+                    return None, str(e)
+
+            if orders_to_place:
+                with ThreadPoolExecutor(max_workers=min(len(orders_to_place), BATCH_MAX_WORKERS)) as executor:
+                    outcomes = list(executor.map(submit, orders_to_place))
+
+                for candidate, (order, error) in zip(orders_to_place, outcomes):
+                    result = results[candidate['index']]
+                    if order:
+                        with data_lock:
+                            total_trades_today += 1
+                        result.update({
+                            "status": "success",
+                            "order_id": order.get('id'),
+                            "side": candidate['side'],
+                            "quantity": candidate['quantity'],
+                            "entry_price": candidate['price'],
+                            "sl": candidate['sl'],
+                            "tp": candidate['tp']
+                        })
+                    else:
+                        result.update({"status": "error", "reason": error or "Order placement failed"})
+        finally:
+            release_slots(reserved)
+
+        placed = sum(1 for r in results if r.get('status') == 'success')
+        log_message(f"📦 Batch done: {placed}/{len(signals)} orders placed")
+
+        with data_lock:
+            trades_today = total_trades_today
+
+        return jsonify({
+            "status": "success" if placed == len(signals) else ("partial" if placed else "rejected"),
+            "placed": placed,
+            "total": len(signals),
+            "results": results,
+            "trades_today": trades_today
+        }), 200
+
+    except Exception as e:
+        log_message(f"❌ Batch webhook error: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 # ============= HEALTH CHECK =============
 @app.route('/health', methods=['GET'])
 def health():
@@ -537,6 +866,8 @@ def health():
                 "exchange": "WazirX",  # ✅ FIXED
                 "balance_usdt": balance['usdt_free'],
                 "daily_pnl_usdt": round(daily_pnl_usdt, 2),
+                "drawdown_usdt": round(analytics.current_drawdown(), 2),
+                "max_drawdown_limit_usdt": MAX_DRAWDOWN_USDT,
                 "trades_today": total_trades_today,
                 "winning_trades": winning_trades_today,
                 "losing_trades": losing_trades_today,
@@ -576,6 +907,19 @@ def get_positions():
 
     return jsonify(positions_data), 200
 
+# ============= P&L / RISK ANALYTICS =============
+@app.route('/analytics', methods=['GET'])
+def get_analytics():
+    try:
+        curve_points = int(request.args.get('curve_points', 100))
+    except ValueError:
+        return jsonify({"status": "error", "reason": "curve_points must be an integer"}), 400
+
+    try:
+        return jsonify(analytics.snapshot(curve_points=curve_points)), 200
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 # ============= CLOSE ALL POSITIONS =============
 @app.route('/close_all', methods=['POST'])
 def close_all_positions():
@@ -594,6 +938,8 @@ def close_all_positions():
             except Exception as e:
                 log_message(f"❌ Failed to close {order_id}: {e}")
 
+        analytics.record_equity()
+
         return jsonify({
             "status": "success",
             "closed_positions": closed_count,
@@ -23,7 +23,9 @@ RISK_PER_TRADE_PERCENT = 100  # Testing: 100%, Production: 1-2%
 MAX_POSITION_SIZE_USDT = 200  # ✅ CHANGE 2: 1.2 se badhaya (₹108 = ~$1.3, so 200 safe hai)
 MIN_BALANCE_USDT = 0
 MAX_DAILY_LOSS_USDT = 5.0
+MAX_DRAWDOWN_USDT = 10.0     # Realized + unrealized equity ka peak se max girna (daily reset)
 MAX_OPEN_POSITIONS = 3
+BATCH_MAX_RISK_PERCENT = 100  # /webhook/batch ka total risk (free balance ka %), priority order mein baanta jaata hai
 
 # ============= ORDER SETTINGS =============
 SLIPPAGE_PERCENT = 0.5
@@ -31,6 +33,7 @@ RATE_LIMIT_ENABLED = True
 REQUEST_TIMEOUT_SECONDS = 10
 ORDER_CHECK_INTERVAL_SECONDS = 5
 ORDER_TIMEOUT_MINUTES = 30
+BATCH_MAX_WORKERS = 5         # /webhook/batch mein ek saath kitne orders bhejne hain
 
 # ============= SYMBOL MAPPING =============
 # TradingView se aane wale symbols → exchange format mein convert
@@ -67,3 +70,7 @@ TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
 # ============= STOP LOSS / TAKE PROFIT =============
 DEFAULT_SL_PERCENT = 2.0
 DEFAULT_TP_PERCENT = 4.0
+
+# ============= ANALYTICS =============
+ANALYTICS_WINDOWS = [10, 50]      # Win rate / expectancy kitne last trades par
+ANALYTICS_EQUITY_POINTS = 500     # Equity curve mein max kitne points yaad rakhne hain